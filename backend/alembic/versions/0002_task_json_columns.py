@@ -0,0 +1,52 @@
+"""store task tags, acceptance criteria and subtasks as JSON
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_COLUMNS = ('tags', 'acceptance_criteria', 'subtasks')
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in JSON_COLUMNS:
+            op.alter_column(
+                'tasks', column,
+                type_=postgresql.JSONB(),
+                postgresql_using=f'{column}::jsonb'
+            )
+        return
+
+    # SQLite keeps JSON as text, so only the declared type changes
+    with op.batch_alter_table('tasks') as batch_op:
+        for column in JSON_COLUMNS:
+            batch_op.alter_column(column, type_=sa.JSON())
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in JSON_COLUMNS:
+            op.alter_column(
+                'tasks', column,
+                type_=sa.Text(),
+                postgresql_using=f'{column}::text'
+            )
+        return
+
+    with op.batch_alter_table('tasks') as batch_op:
+        for column in JSON_COLUMNS:
+            batch_op.alter_column(column, type_=sa.Text())
@@ -0,0 +1,64 @@
+"""store task status, type and risk level as small integer codes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (column, enum type name, member names in code order, nullable)
+ENUM_COLUMNS = (
+    ('status', 'taskstatus', ('TODO', 'IN_PROGRESS', 'DONE', 'BLOCKED', 'UNCLEAR'), False),
+    ('task_type', 'tasktype', ('FEATURE', 'BUG', 'RESEARCH', 'BLOCKED', 'UNCLEAR'), True),
+    ('ai_risk_level', 'risklevel', ('LOW', 'MEDIUM', 'HIGH'), True),
+)
+
+
+def upgrade() -> None:
+    for column, _, names, _ in ENUM_COLUMNS:
+        op.add_column('tasks', sa.Column(f'{column}_code', sa.SmallInteger(), nullable=True))
+        cases = ' '.join(f"WHEN '{name}' THEN {code}" for code, name in enumerate(names))
+        op.execute(f"UPDATE tasks SET {column}_code = CASE {column} {cases} END")
+
+    with op.batch_alter_table('tasks') as batch_op:
+        for column, _, _, nullable in ENUM_COLUMNS:
+            batch_op.drop_column(column)
+            batch_op.alter_column(
+                f'{column}_code',
+                new_column_name=column,
+                existing_type=sa.SmallInteger(),
+                nullable=nullable
+            )
+
+    for _, enum_name, _, _ in ENUM_COLUMNS:
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
+
+
+def downgrade() -> None:
+    for column, enum_name, names, _ in ENUM_COLUMNS:
+        enum_type = sa.Enum(*names, name=enum_name)
+        enum_type.create(op.get_bind(), checkfirst=True)
+        op.add_column('tasks', sa.Column(f'{column}_name', enum_type, nullable=True))
+        cases = ' '.join(f"WHEN {code} THEN '{name}'" for code, name in enumerate(names))
+        op.execute(f"UPDATE tasks SET {column}_name = CASE {column} {cases} END")
+
+    with op.batch_alter_table('tasks') as batch_op:
+        for column, enum_name, names, nullable in ENUM_COLUMNS:
+            batch_op.drop_column(column)
+            batch_op.alter_column(
+                f'{column}_name',
+                new_column_name=column,
+                existing_type=sa.Enum(*names, name=enum_name),
+                nullable=nullable
+            )
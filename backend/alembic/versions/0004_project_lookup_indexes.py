@@ -0,0 +1,33 @@
+"""index tasks and daily reports by project
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_tasks_project_id'), 'tasks', ['project_id'], unique=False)
+    op.create_index(
+        'ix_daily_reports_project_date',
+        'daily_reports',
+        ['project_id', sa.text('date DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_daily_reports_project_date', table_name='daily_reports')
+    op.drop_index(op.f('ix_tasks_project_id'), table_name='tasks')
@@ -0,0 +1,35 @@
+"""one daily report per project per day
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the newest report where concurrent requests wrote duplicates
+    op.execute(
+        "DELETE FROM daily_reports WHERE id NOT IN "
+        "(SELECT MAX(id) FROM daily_reports GROUP BY project_id, date)"
+    )
+    op.create_index(
+        'uq_daily_reports_project_date',
+        'daily_reports',
+        ['project_id', 'date'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_daily_reports_project_date', table_name='daily_reports')
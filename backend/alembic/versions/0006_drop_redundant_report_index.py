@@ -0,0 +1,31 @@
+"""drop daily report index covered by the unique project/date index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_daily_reports_project_date', table_name='daily_reports')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_daily_reports_project_date',
+        'daily_reports',
+        ['project_id', sa.text('date DESC')],
+        unique=False
+    )
@@ -0,0 +1,32 @@
+"""track whether background AI enrichment has run for a task
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'tasks',
+        sa.Column('ai_analyzed', sa.Boolean(), server_default=sa.false(), nullable=False)
+    )
+    # Enrichment always sets story points, so tasks that have them were already analyzed
+    op.execute("UPDATE tasks SET ai_analyzed = (story_points IS NOT NULL)")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('ai_analyzed')
@@ -1,14 +1,43 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from ..core.database import get_db
-from ..models.user import User
 from ..models.project import Project
-from .auth import get_current_user
+from .auth import CurrentUser, get_current_user
 
 router = APIRouter()
 
+# Built once at import so each ownership check only binds parameters
+OWNED_PROJECT_QUERY = select(Project).where(
+    Project.id == bindparam("project_id"),
+    Project.user_id == bindparam("user_id")
+)
+
+
+async def get_owned_project(db: AsyncSession, project_id: int, user: CurrentUser) -> Project:
+    """Load a project owned by the user or raise 404"""
+    result = await db.execute(OWNED_PROJECT_QUERY, {"project_id": project_id, "user_id": user.id})
+    project = result.scalar_one_or_none()
+
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+
+    return project
+
+
+async def require_owned_project(
+    project_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Project:
+    """Dependency resolving the path project for the current user"""
+    return await get_owned_project(db, project_id, current_user)
+
 
 class ProjectCreate(BaseModel):
     name: str
@@ -26,10 +55,10 @@ class ProjectResponse(BaseModel):
 
 
 @router.post("", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
-def create_project(
+async def create_project(
     project_data: ProjectCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new project"""
     project = Project(
@@ -39,62 +68,35 @@ def create_project(
     )
 
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    await db.refresh(project)
 
     return project
 
 
 @router.get("", response_model=List[ProjectResponse])
-def get_projects(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_projects(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all projects for current user"""
-    projects = db.query(Project).filter(Project.user_id == current_user.id).all()
-    return projects
+    result = await db.execute(select(Project).where(Project.user_id == current_user.id))
+    return result.scalars().all()
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
-def get_project(
-    project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+async def get_project(project: Project = Depends(require_owned_project)):
     """Get a specific project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
     return project
 
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(
-    project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def delete_project(
+    project: Project = Depends(require_owned_project),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
 
     return None
@@ -1,122 +1,97 @@
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..core.database import get_db
-from ..models.user import User
 from ..models.project import Project
+from ..models.daily_report import DailyReport
 from ..services.report_service import ReportService
-from .auth import get_current_user
+from .auth import CurrentUser, get_current_user
+from .projects import require_owned_project
 
 router = APIRouter()
 
+LATEST_REPORT_QUERY = (
+    select(DailyReport)
+    .join(Project)
+    .where(
+        DailyReport.project_id == bindparam("project_id"),
+        Project.user_id == bindparam("user_id")
+    )
+    .order_by(DailyReport.date.desc())
+    .limit(1)
+)
+
+OWNED_PROJECT_EXISTS_QUERY = select(
+    exists().where(
+        Project.id == bindparam("project_id"),
+        Project.user_id == bindparam("user_id")
+    )
+)
+
 
 @router.post("/generate/{project_id}")
-def generate_report(
-    project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def generate_report(
+    project: Project = Depends(require_owned_project),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """Generate daily report for a project"""
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
     # Generate report
     report_service = ReportService(db)
-    report = report_service.generate_daily_report(project_id)
+    report = await report_service.generate_daily_report(project.id)
 
-    return report_service.get_report_summary(report.id)
+    return await report_service.get_report_summary(report.id)
 
 
 @router.get("/{project_id}/latest")
-def get_latest_report(
+async def get_latest_report(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """Get latest report for a project"""
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
-    # Get latest report
-    from ..models.daily_report import DailyReport
-    report = db.query(DailyReport).filter(
-        DailyReport.project_id == project_id
-    ).order_by(DailyReport.date.desc()).first()
+    # Get latest report, verifying project ownership in the same query
+    params = {"project_id": project_id, "user_id": current_user.id}
+    result = await db.execute(LATEST_REPORT_QUERY, params)
+    report = result.scalar_one_or_none()
 
     if not report:
+        # Tell a missing project apart from one without reports
+        if not await db.scalar(OWNED_PROJECT_EXISTS_QUERY, params):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No reports found for this project"
         )
 
     report_service = ReportService(db)
-    return report_service.get_report_summary(report.id)
+    return await report_service.get_report_summary(report.id)
 
 
 @router.get("/{project_id}/timeline-status")
-def get_timeline_status(
-    project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_timeline_status(
+    project: Project = Depends(require_owned_project),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """Get timeline status for a project"""
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
     # Get timeline status
     report_service = ReportService(db)
-    return report_service.get_timeline_status(project_id)
+    return await report_service.get_timeline_status(project.id)
 
 
 @router.get("/{project_id}/stakeholder-email")
-def get_stakeholder_email(
-    project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_stakeholder_email(
+    project: Project = Depends(require_owned_project),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, str]:
     """Generate stakeholder update email"""
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
     # Generate email
     report_service = ReportService(db)
-    email_content = report_service.generate_stakeholder_email(project_id)
+    email_content = await report_service.generate_stakeholder_email(project.id)
 
     return {
         "subject": f"Project Update: {project.name}",
@@ -1,18 +1,35 @@
+import codecs
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status, UploadFile, File, Form
+from fastapi.responses import Response
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
-import json
 from ..core.database import get_db
-from ..models.user import User
+from ..core.etag import etag_matches, not_modified
 from ..models.project import Project
 from ..models.task import Task, TaskStatus
-from ..services.task_service import TaskService
-from .auth import get_current_user
+from ..services.task_service import TaskService, run_ai_enrichment
+from .auth import CurrentUser, get_current_user
+from .projects import get_owned_project, require_owned_project
 
 router = APIRouter()
 
+OWNED_TASK_QUERY = select(Task).join(Project).where(
+    Task.id == bindparam("task_id"),
+    Project.user_id == bindparam("user_id")
+)
+
+PROJECT_TASKS_VERSION_QUERY = select(func.count(Task.id), func.max(Task.updated_at)).where(
+    Task.project_id == bindparam("project_id")
+)
+
+PENDING_ENRICHMENT_QUERY = select(Task.id).where(
+    Task.project_id == bindparam("project_id"),
+    Task.ai_analyzed.is_(False)
+)
+
 
 class TaskCreate(BaseModel):
     project_id: int
@@ -36,6 +53,7 @@ class TaskResponse(BaseModel):
     acceptance_criteria: List[str]
     subtasks: List[str]
     story_points: Optional[int] = None
+    ai_analyzed: bool = False
 
     class Config:
         from_attributes = True
@@ -52,156 +70,168 @@ class TaskResponse(BaseModel):
             assignee=task.assignee,
             priority_score=task.priority_score or 0.0,
             ai_risk_level=task.ai_risk_level.value if hasattr(task.ai_risk_level, 'value') else task.ai_risk_level,
-            tags=json.loads(task.tags) if task.tags else [],
-            acceptance_criteria=json.loads(task.acceptance_criteria) if task.acceptance_criteria else [],
-            subtasks=json.loads(task.subtasks) if task.subtasks else [],
-            story_points=task.story_points
+            tags=task.tags or [],
+            acceptance_criteria=task.acceptance_criteria or [],
+            subtasks=task.subtasks or [],
+            story_points=task.story_points,
+            ai_analyzed=bool(task.ai_analyzed)
         )
 
 
-@router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-def create_task(
+@router.post("", response_model=TaskResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_task(
     task_data: TaskCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Create a new task with AI analysis"""
+    """Create a new task; AI analysis is added in the background"""
     # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == task_data.project_id,
-        Project.user_id == current_user.id
-    ).first()
+    await get_owned_project(db, task_data.project_id, current_user)
 
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    # Parse optional deadline
+    deadline = None
+    if task_data.deadline:
+        try:
+            deadline = datetime.fromisoformat(task_data.deadline)
+        except:
+            pass
 
-    # Create task with AI analysis
+    # Store the task, then analyze it with AI after the response is sent
     task_service = TaskService(db)
-    task = task_service.create_task_from_text(
+    task = await task_service.create_task_from_text(
         task_data.title,
         task_data.description,
-        task_data.project_id
+        task_data.project_id,
+        deadline=deadline,
+        assignee=task_data.assignee
     )
+    background_tasks.add_task(run_ai_enrichment, [task.id])
 
-    # Update optional fields
-    if task_data.deadline:
-        try:
-            task.deadline = datetime.fromisoformat(task_data.deadline)
-        except:
-            pass
+    return TaskResponse.from_orm(task)
 
-    if task_data.assignee:
-        task.assignee = task_data.assignee
 
-    db.commit()
-    db.refresh(task)
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(
+    task_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a single task, e.g. to check whether AI analysis has finished"""
+    result = await db.execute(OWNED_TASK_QUERY, {"task_id": task_id, "user_id": current_user.id})
+    task = result.scalar_one_or_none()
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
 
     return TaskResponse.from_orm(task)
 
 
 @router.get("/project/{project_id}", response_model=List[TaskResponse])
-def get_project_tasks(
-    project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_project_tasks(
+    request: Request,
+    response: Response,
+    project: Project = Depends(require_owned_project),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all tasks for a project"""
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    # Task count and last update identify the list without loading it
+    result = await db.execute(PROJECT_TASKS_VERSION_QUERY, {"project_id": project.id})
+    task_count, last_updated = result.one()
+    etag = f'"tasks-{project.id}-{task_count}-{last_updated.timestamp() if last_updated else 0}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    result = await db.execute(select(Task).where(Task.project_id == project.id))
+    tasks = result.scalars().all()
+    return [TaskResponse.from_orm(task) for task in tasks]
 
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
 
-    tasks = db.query(Task).filter(Task.project_id == project_id).all()
-    return [TaskResponse.from_orm(task) for task in tasks]
+@router.post("/project/{project_id}/enrich", status_code=status.HTTP_202_ACCEPTED)
+async def enrich_project_tasks(
+    background_tasks: BackgroundTasks,
+    project: Project = Depends(require_owned_project),
+    db: AsyncSession = Depends(get_db)
+):
+    """Queue AI analysis for project tasks that do not have it yet"""
+    # Picks up tasks whose earlier analysis failed or was interrupted
+    result = await db.execute(PENDING_ENRICHMENT_QUERY, {"project_id": project.id})
+    task_ids = result.scalars().all()
+    if task_ids:
+        background_tasks.add_task(run_ai_enrichment, task_ids)
+
+    return {"message": "AI analysis queued", "queued": len(task_ids)}
 
 
 @router.post("/import/csv", response_model=List[TaskResponse])
 async def import_csv(
+    background_tasks: BackgroundTasks,
     project_id: int = Form(...),
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Import tasks from CSV file"""
     # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    await get_owned_project(db, project_id, current_user)
 
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
-    # Read CSV content
-    content = await file.read()
-    csv_content = content.decode('utf-8')
+    # Decode the spooled upload line by line instead of all at once
+    csv_lines = codecs.iterdecode(file.file, 'utf-8')
 
     # Import tasks
     task_service = TaskService(db)
-    tasks = task_service.import_from_csv(csv_content, project_id)
+    tasks = await task_service.import_from_csv(csv_lines, project_id)
+
+    # Analyze imported tasks with AI after the response is sent
+    background_tasks.add_task(run_ai_enrichment, [task.id for task in tasks])
 
     return [TaskResponse.from_orm(task) for task in tasks]
 
 
 @router.post("/import/trello")
 async def import_trello(
+    background_tasks: BackgroundTasks,
     project_id: int = Form(...),
     board_id: str = Form(...),
     api_key: str = Form(...),
     token: str = Form(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Import tasks from Trello board"""
     # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    await get_owned_project(db, project_id, current_user)
 
     # Import tasks
     try:
         task_service = TaskService(db)
-        tasks = task_service.import_from_trello(board_id, project_id, api_key, token)
-        return [TaskResponse.from_orm(task) for task in tasks]
+        tasks = await task_service.import_from_trello(board_id, project_id, api_key, token)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error importing from Trello: {str(e)}"
         )
 
+    # Analyze imported tasks with AI after the response is sent
+    background_tasks.add_task(run_ai_enrichment, [task.id for task in tasks])
+
+    return [TaskResponse.from_orm(task) for task in tasks]
+
 
 @router.patch("/{task_id}/status")
-def update_task_status(
+async def update_task_status(
     task_id: int,
     status: TaskStatus,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update task status"""
-    task = db.query(Task).join(Project).filter(
-        Task.id == task_id,
-        Project.user_id == current_user.id
-    ).first()
+    result = await db.execute(OWNED_TASK_QUERY, {"task_id": task_id, "user_id": current_user.id})
+    task = result.scalar_one_or_none()
 
     if not task:
         raise HTTPException(
@@ -210,6 +240,6 @@ def update_task_status(
         )
 
     task.status = status
-    db.commit()
+    await db.commit()
 
     return {"message": "Status updated successfully"}
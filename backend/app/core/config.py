@@ -7,6 +7,11 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "sqlite:///./aipm.db"
+    # Per worker process; see the connection budget in docs/DEPLOYMENT.md
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_QUERY_CACHE_SIZE: int = 1200
 
     # API Keys
     ANTHROPIC_API_KEY: str
@@ -33,6 +38,7 @@ class Settings(BaseSettings):
     # App Settings
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
+    AUTO_CREATE_TABLES: bool = True
     API_V1_PREFIX: str = "/api/v1"
     PROJECT_NAME: str = "AI Project Manager Assistant"
 
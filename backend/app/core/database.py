@@ -1,25 +1,77 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import orjson
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, raiseload
 from .config import settings
 
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+class AppSession(Session):
+    """Sync session backing every AsyncSession handed out by get_db"""
+
+
+def get_engine_options(url: str) -> dict:
+    """Connection pool settings for the configured database"""
+    if url.startswith("sqlite"):
+        # SQLite connections are local files, so pool sizing does not apply
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+def orjson_serializer(value) -> str:
+    """Serialize JSON columns with orjson"""
+    return orjson.dumps(value).decode()
+
+
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    json_serializer=orjson_serializer,
+    json_deserializer=orjson.loads,
+    # Compiled SQL kept per engine, so hot statements skip recompilation
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    **get_engine_options(settings.DATABASE_URL)
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    sync_session_class=AppSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
+if settings.ENVIRONMENT != "production":
+    @event.listens_for(AppSession, "do_orm_execute")
+    def _raise_on_lazy_load(orm_execute_state):
+        """Turn any relationship not loaded explicitly into an error outside production"""
+        if (
+            orm_execute_state.is_select
+            and not orm_execute_state.is_column_load
+            and not orm_execute_state.is_relationship_load
+        ):
+            orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*"))
+
+
+async def get_db():
     """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
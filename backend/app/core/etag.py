@@ -0,0 +1,69 @@
+from hashlib import blake2b
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match already holds this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching ETag"""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+class ETagMiddleware:
+    """Tag successful GET responses with a hash of their body and answer repeats with 304"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message = {}
+        body_chunks = []
+        passthrough = False
+
+        async def send_with_etag(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if message["status"] != 200 or "etag" in headers:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            # Hold the body back until it is complete so it can be hashed
+            body_chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(body_chunks)
+            etag = f'"{blake2b(body, digest_size=8).hexdigest()}"'
+
+            # Edit the raw header list in place so repeated headers like Set-Cookie survive
+            headers = MutableHeaders(scope=start_message)
+            headers["etag"] = etag
+            if etag_matches(Request(scope), etag):
+                del headers["content-length"]
+                del headers["content-type"]
+                start_message["status"] = 304
+                body = b""
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_etag)
@@ -1,4 +1,6 @@
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -31,10 +33,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[dict]:
-    """Decode JWT access token"""
+@lru_cache(maxsize=4096)
+def _verify_token(token: str) -> Optional[dict]:
+    """Verify a JWT signature once per distinct token"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         return None
+
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Decode JWT access token"""
+    payload = _verify_token(token)
+
+    # A cached payload can outlive its token, so re-check expiry on every call
+    if payload is None or payload.get("exp", 0) <= time.time():
+        return None
+
+    return payload
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, Text, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import date
 from ..core.database import Base
@@ -15,5 +15,11 @@ class DailyReport(Base):
     risks_json = Column(Text)  # JSON string of detected risks
     blocked_tasks_json = Column(Text)  # JSON string of blocked items
 
+    __table_args__ = (
+        # One report per project per day, the conflict target for report upserts.
+        # Scanned backwards, it also serves the latest-report-per-project lookup without a sort
+        Index("uq_daily_reports_project_date", project_id, date, unique=True),
+    )
+
     # Relationships
     project = relationship("Project", back_populates="daily_reports")
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Enum
+from sqlalchemy import Boolean, Column, Integer, SmallInteger, String, Text, DateTime, ForeignKey, Float, JSON, false
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -27,25 +29,52 @@ class RiskLevel(str, enum.Enum):
     HIGH = "high"
 
 
+class EnumCode(TypeDecorator):
+    """Store a str enum as a small integer code (its position in the enum)
+
+    Codes follow member declaration order, so new members must be appended.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class):
+        super().__init__()
+        self.enum_class = enum_class
+        self._members = tuple(enum_class)
+        self._codes = {member: code for code, member in enumerate(self._members)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self._codes[self.enum_class(value)]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self._members[value]
+
+
 class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String, nullable=False)
     description = Column(Text)
-    status = Column(Enum(TaskStatus), default=TaskStatus.TODO, nullable=False)
-    task_type = Column(Enum(TaskType), default=TaskType.FEATURE)
+    status = Column(EnumCode(TaskStatus), default=TaskStatus.TODO, nullable=False)
+    task_type = Column(EnumCode(TaskType), default=TaskType.FEATURE)
     deadline = Column(DateTime)
     assignee = Column(String)
     priority_score = Column(Float, default=0.0)  # AI-calculated priority
-    ai_risk_level = Column(Enum(RiskLevel), default=RiskLevel.LOW)
-    tags = Column(Text)  # JSON string of AI-generated tags
-    acceptance_criteria = Column(Text)  # AI-generated acceptance criteria
-    subtasks = Column(Text)  # JSON string of subtasks
+    ai_risk_level = Column(EnumCode(RiskLevel), default=RiskLevel.LOW)
+    tags = Column(JSON().with_variant(JSONB(), "postgresql"), default=list)  # AI-generated tags
+    acceptance_criteria = Column(JSON().with_variant(JSONB(), "postgresql"), default=list)  # AI-generated acceptance criteria
+    subtasks = Column(JSON().with_variant(JSONB(), "postgresql"), default=list)  # AI-generated subtasks
     story_points = Column(Integer)  # AI-estimated effort
+    ai_analyzed = Column(Boolean, default=False, server_default=false(), nullable=False)  # Set once background AI enrichment has run
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     project = relationship("Project", back_populates="tasks")
+
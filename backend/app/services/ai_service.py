@@ -1,21 +1,112 @@
-import json
-from typing import List, Dict, Any
-from anthropic import Anthropic
+import heapq
+import re
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import orjson
+from anthropic import AsyncAnthropic
 from ..core.config import settings
 from ..models.task import Task, TaskType, RiskLevel
 
 
+# Shared client so every request reuses the same connection pool
+anthropic_client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+
+# Below this many tasks the per-task loop beats building NumPy arrays
+VECTORIZED_RANKING_MIN_TASKS = 100
+
+# Priority score contributions shared by the per-task and vectorized scorers
+PRIORITY_STATUS_WEIGHTS = {'blocked': 40, 'in_progress': 25}
+PRIORITY_RISK_WEIGHTS = {'high': 30, 'medium': 15, 'low': 5}
+PRIORITY_TYPE_WEIGHTS = {'bug': 20}
+
+# Keyword groups in the order classify_task_type gives them precedence
+TASK_TYPE_KEYWORDS = (
+    (TaskType.BUG, ('fix', 'bug', 'error', 'issue', 'broken')),
+    (TaskType.RESEARCH, ('research', 'investigate', 'explore', 'study')),
+    (TaskType.BLOCKED, ('blocked', 'waiting', 'dependency')),
+)
+
+# One lookahead alternation finds every keyword, overlapping ones included, in a single scan
+TASK_TYPE_PATTERN = re.compile('(?=' + '|'.join(
+    f"(?P<{task_type.name}>{'|'.join(keywords)})" for task_type, keywords in TASK_TYPE_KEYWORDS
+) + ')')
+
+TASK_TYPE_VALUES = tuple(task_type.value for task_type in TaskType)
+
+# What every task analysis should cover, shared by the single and batch prompts
+TASK_ANALYSIS_INSTRUCTIONS = f"""1. A detailed description (if not provided or unclear)
+2. Acceptance criteria (clear, testable conditions for completion)
+3. Subtasks (break down into smaller actionable steps)
+4. Story point estimate (1, 2, 3, 5, 8, 13, or 21)
+5. Task type ({', '.join(TASK_TYPE_VALUES)})
+6. Relevant tags (3-5 keywords)"""
+
+TASK_ANALYSIS_TOOL = {
+    "name": "analyze_task",
+    "description": "Record the breakdown of a project task",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "description": {"type": "string"},
+            "acceptance_criteria": {"type": "array", "items": {"type": "string"}},
+            "subtasks": {"type": "array", "items": {"type": "string"}},
+            "story_points": {"type": "integer", "enum": [1, 2, 3, 5, 8, 13, 21]},
+            "task_type": {"type": "string", "enum": list(TASK_TYPE_VALUES)},
+            "tags": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["description", "acceptance_criteria", "subtasks", "story_points", "task_type", "tags"]
+    }
+}
+
+TASK_BATCH_ANALYSIS_TOOL = {
+    "name": "analyze_tasks",
+    "description": "Record the breakdown of several project tasks, in the order they were given",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "analyses": {"type": "array", "items": TASK_ANALYSIS_TOOL["input_schema"]}
+        },
+        "required": ["analyses"]
+    }
+}
+
+_TASK_REASON = {
+    "type": "object",
+    "properties": {
+        "task": {"type": "string"},
+        "reason": {"type": "string"}
+    },
+    "required": ["task", "reason"]
+}
+
+DAILY_SUMMARY_TOOL = {
+    "name": "daily_summary",
+    "description": "Record the daily summary of a project",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "key_progress": {"type": "array", "items": {"type": "string"}},
+            "risks": {"type": "array", "items": _TASK_REASON},
+            "urgent_tasks": {"type": "array", "items": {"type": "string"}},
+            "blocked_items": {"type": "array", "items": _TASK_REASON},
+            "summary_text": {"type": "string"}
+        },
+        "required": ["key_progress", "risks", "urgent_tasks", "blocked_items", "summary_text"]
+    }
+}
+
+
 class AIService:
     """Service for all AI-powered features using Claude"""
 
     def __init__(self):
-        self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.client = anthropic_client
         self.model = "claude-3-5-sonnet-20241022"
 
-    def analyze_task(self, task_title: str, task_description: str = "") -> Dict[str, Any]:
+    async def _request_task_analysis(self, task_title: str, task_description: str) -> Dict[str, Any]:
         """
-        Analyze a task and return detailed breakdown with acceptance criteria,
-        subtasks, story points, tags, and task type.
+        Analyze one task and return detailed breakdown with acceptance criteria,
+        subtasks, story points, tags, and task type. Errors are left to the caller.
         """
         prompt = f"""Analyze this project task and provide a detailed breakdown:
 
@@ -23,48 +114,94 @@ Task Title: {task_title}
 Task Description: {task_description if task_description else "No description provided"}
 
 Please provide:
-1. A detailed description (if not provided or unclear)
-2. Acceptance criteria (clear, testable conditions for completion)
-3. Subtasks (break down into smaller actionable steps)
-4. Story point estimate (1, 2, 3, 5, 8, 13, or 21)
-5. Task type (feature, bug, research, blocked, unclear)
-6. Relevant tags (3-5 keywords)
-
-Return your analysis as a JSON object with these exact keys:
-{{
-    "description": "detailed description",
-    "acceptance_criteria": ["criterion 1", "criterion 2", ...],
-    "subtasks": ["subtask 1", "subtask 2", ...],
-    "story_points": 5,
-    "task_type": "feature",
-    "tags": ["tag1", "tag2", "tag3"]
-}}"""
+{TASK_ANALYSIS_INSTRUCTIONS}
+
+Record your analysis with the analyze_task tool."""
+
+        response = await self.client.messages.create(
+            model=self.model,
+            max_tokens=2000,
+            tools=[TASK_ANALYSIS_TOOL],
+            tool_choice={"type": "tool", "name": TASK_ANALYSIS_TOOL["name"]},
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+        # Forced tool use returns the analysis already parsed
+        return response.content[0].input
+
+    async def analyze_tasks_batch(self, tasks: List[Tuple[str, str]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze several (title, description) pairs with a single Claude call.
+        Returns one analysis per task, in the order given, with None for any
+        task whose analysis failed.
+        """
+        if len(tasks) == 1:
+            return await self._analyze_each(tasks)
+
+        task_list = "\n\n".join(
+            f"Task {number}\nTitle: {title}\nDescription: {description if description else 'No description provided'}"
+            for number, (title, description) in enumerate(tasks, start=1)
+        )
+        prompt = f"""Analyze each of these project tasks and provide a detailed breakdown:
+
+{task_list}
+
+For every task, please provide:
+{TASK_ANALYSIS_INSTRUCTIONS}
+
+Record all {len(tasks)} analyses with the analyze_tasks tool, in the same order as the tasks above."""
 
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=self.model,
-                max_tokens=2000,
+                max_tokens=8000,
+                tools=[TASK_BATCH_ANALYSIS_TOOL],
+                tool_choice={"type": "tool", "name": TASK_BATCH_ANALYSIS_TOOL["name"]},
                 messages=[{"role": "user", "content": prompt}]
             )
 
-            content = response.content[0].text
-            # Extract JSON from response
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            json_str = content[start:end]
-            result = json.loads(json_str)
-
-            return result
+            analyses = response.content[0].input.get("analyses", [])
+            if len(analyses) == len(tasks):
+                return [analysis if self._valid_analysis(analysis) else None for analysis in analyses]
+            print(f"Batch analysis returned {len(analyses)} results for {len(tasks)} tasks")
         except Exception as e:
-            print(f"Error analyzing task: {e}")
-            return {
-                "description": task_description or task_title,
-                "acceptance_criteria": [],
-                "subtasks": [],
-                "story_points": 3,
-                "task_type": "feature",
-                "tags": []
-            }
+            print(f"Error analyzing task batch: {e}")
+
+        # Fall back to one call per task, one at a time so the caller's concurrency cap still holds
+        return await self._analyze_each(tasks)
+
+    async def _analyze_each(self, tasks: List[Tuple[str, str]]) -> List[Optional[Dict[str, Any]]]:
+        """Analyze tasks one call at a time, using None for failed analyses"""
+        analyses = []
+        for title, description in tasks:
+            try:
+                analysis = await self._request_task_analysis(title, description)
+            except Exception as e:
+                print(f"Error analyzing task: {e}")
+                analysis = None
+            analyses.append(analysis if self._valid_analysis(analysis) else None)
+        return analyses
+
+    def _valid_analysis(self, analysis: Any) -> bool:
+        """Check an analysis only holds values the Task columns accept"""
+        if analysis is None:
+            return False
+        if not isinstance(analysis, dict):
+            print(f"Discarding task analysis that is not an object: {analysis!r}")
+            return False
+
+        description = analysis.get('description', '')
+        task_type = analysis.get('task_type', 'feature')
+        story_points = analysis.get('story_points', 3)
+        if (
+            isinstance(description, str)
+            and task_type in TASK_TYPE_VALUES
+            and isinstance(story_points, int) and not isinstance(story_points, bool)
+        ):
+            return True
+
+        print(f"Discarding invalid task analysis: task_type={task_type!r}, story_points={story_points!r}")
+        return False
 
     def detect_risk_level(self, task: Dict[str, Any]) -> str:
         """Detect risk level for a task based on various factors"""
@@ -114,22 +251,17 @@ Return your analysis as a JSON object with these exact keys:
                 score += 20
 
         # Status
-        if task.get('status') == 'blocked':
-            score += 40
-        elif task.get('status') == 'in_progress':
-            score += 25
+        score += PRIORITY_STATUS_WEIGHTS.get(task.get('status'), 0)
 
         # Risk level
-        risk_weights = {'high': 30, 'medium': 15, 'low': 5}
-        score += risk_weights.get(task.get('ai_risk_level', 'low'), 5)
+        score += PRIORITY_RISK_WEIGHTS.get(task.get('ai_risk_level', 'low'), 5)
 
         # Task type
-        if task.get('task_type') == 'bug':
-            score += 20
+        score += PRIORITY_TYPE_WEIGHTS.get(task.get('task_type'), 0)
 
         return score
 
-    def generate_daily_summary(self, tasks: List[Dict[str, Any]], project_name: str) -> Dict[str, Any]:
+    async def generate_daily_summary(self, tasks: List[Dict[str, Any]], project_name: str) -> Dict[str, Any]:
         """
         Generate comprehensive daily project summary with progress,
         risks, urgent tasks, and blocked items.
@@ -149,7 +281,7 @@ Return your analysis as a JSON object with these exact keys:
         prompt = f"""Analyze this project's current status and generate a comprehensive daily summary:
 
 Project: {project_name}
-Tasks: {json.dumps(task_summary, indent=2)}
+Tasks: {orjson.dumps(task_summary, option=orjson.OPT_INDENT_2).decode()}
 
 Generate a daily summary with these sections:
 
@@ -158,35 +290,20 @@ Generate a daily summary with these sections:
 3. **Urgent Tasks Today** (top 3-5 most critical tasks)
 4. **Blocked Items** (tasks that cannot proceed and why)
 
-Format your response as JSON:
-{{
-    "key_progress": ["progress 1", "progress 2", "progress 3"],
-    "risks": [
-        {{"task": "task name", "reason": "why it's at risk"}},
-        ...
-    ],
-    "urgent_tasks": ["task 1", "task 2", "task 3"],
-    "blocked_items": [
-        {{"task": "task name", "reason": "blocking reason"}},
-        ...
-    ],
-    "summary_text": "A brief paragraph summarizing overall project health and key observations"
-}}"""
+Also write summary_text: a brief paragraph summarizing overall project health and key observations.
+
+Record the summary with the daily_summary tool."""
 
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=3000,
+                tools=[DAILY_SUMMARY_TOOL],
+                tool_choice={"type": "tool", "name": DAILY_SUMMARY_TOOL["name"]},
                 messages=[{"role": "user", "content": prompt}]
             )
 
-            content = response.content[0].text
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            json_str = content[start:end]
-            result = json.loads(json_str)
-
-            return result
+            return response.content[0].input
         except Exception as e:
             print(f"Error generating summary: {e}")
             return {
@@ -197,12 +314,12 @@ Format your response as JSON:
                 "summary_text": "Unable to generate summary at this time."
             }
 
-    def generate_stakeholder_update(self, daily_summary: Dict[str, Any], project_name: str) -> str:
+    async def generate_stakeholder_update(self, daily_summary: Dict[str, Any], project_name: str) -> str:
         """Generate a stakeholder-friendly update message"""
         prompt = f"""Based on this project summary, write a professional stakeholder update email:
 
 Project: {project_name}
-Summary Data: {json.dumps(daily_summary, indent=2)}
+Summary Data: {orjson.dumps(daily_summary, option=orjson.OPT_INDENT_2).decode()}
 
 Write a concise, professional update that:
 - Highlights key accomplishments
@@ -213,7 +330,7 @@ Write a concise, professional update that:
 Keep it under 200 words."""
 
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=1000,
                 messages=[{"role": "user", "content": prompt}]
@@ -227,23 +344,75 @@ Keep it under 200 words."""
     def classify_task_type(self, title: str, description: str = "") -> str:
         """Quick classification of task type"""
         text = (title + " " + description).lower()
+        matched = {match.lastgroup for match in TASK_TYPE_PATTERN.finditer(text)}
 
-        if any(word in text for word in ['fix', 'bug', 'error', 'issue', 'broken']):
-            return TaskType.BUG.value
-        elif any(word in text for word in ['research', 'investigate', 'explore', 'study']):
-            return TaskType.RESEARCH.value
-        elif any(word in text for word in ['blocked', 'waiting', 'dependency']):
-            return TaskType.BLOCKED.value
-        elif not description or len(description.strip()) < 10:
+        for task_type, _ in TASK_TYPE_KEYWORDS:
+            if task_type.name in matched:
+                return task_type.value
+
+        if not description or len(description.strip()) < 10:
             return TaskType.UNCLEAR.value
         else:
             return TaskType.FEATURE.value
 
-    def rank_tasks_by_priority(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Rank tasks by calculated priority scores"""
-        # Calculate priority for each task
-        for task in tasks:
-            task['priority_score'] = self.calculate_priority_score(task)
-
-        # Sort by priority score (descending)
-        return sorted(tasks, key=lambda x: x.get('priority_score', 0), reverse=True)
+    def rank_tasks_by_priority(self, tasks: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Rank tasks by calculated priority scores. Every task gets its
+        priority_score; with top_k only the top_k highest are returned.
+        """
+        if len(tasks) < VECTORIZED_RANKING_MIN_TASKS:
+            # Calculate priority for each task
+            for task in tasks:
+                task['priority_score'] = self.calculate_priority_score(task)
+
+            # Sort by priority score (descending)
+            if top_k is not None:
+                return heapq.nlargest(top_k, tasks, key=lambda x: x.get('priority_score', 0))
+            return sorted(tasks, key=lambda x: x.get('priority_score', 0), reverse=True)
+
+        scores = self._priority_scores(tasks)
+        for task, score in zip(tasks, scores.tolist()):
+            task['priority_score'] = score
+
+        if top_k is not None and 0 < top_k < len(tasks):
+            # Partial selection: every score above the top_k-th, then ties in original order
+            kth_score = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+            above = np.flatnonzero(scores > kth_score)
+            ties = np.flatnonzero(scores == kth_score)[:top_k - len(above)]
+            order = np.concatenate([above, ties])
+        else:
+            order = np.arange(len(tasks))
+
+        # Stable sort keeps equal scores in their original order, like sorted()
+        order = order[np.argsort(-scores[order], kind='stable')]
+        return [tasks[i] for i in order[:top_k]]
+
+    def _priority_scores(self, tasks: List[Dict[str, Any]]) -> np.ndarray:
+        """calculate_priority_score for a whole task list at once"""
+        count = len(tasks)
+
+        has_deadline = np.fromiter((bool(t.get('deadline')) for t in tasks), dtype=bool, count=count)
+        days_until_deadline = np.fromiter(
+            ((t['deadline'] - t.get('current_date', t['deadline'])).days if t.get('deadline') else 0 for t in tasks),
+            dtype=np.int32,
+            count=count
+        )
+
+        # Categorical fields become small integer weight arrays instead of object arrays
+        status = np.fromiter(
+            (PRIORITY_STATUS_WEIGHTS.get(t.get('status'), 0) for t in tasks), dtype=np.int16, count=count
+        )
+        risk = np.fromiter(
+            (PRIORITY_RISK_WEIGHTS.get(t.get('ai_risk_level', 'low'), 5) for t in tasks), dtype=np.int16, count=count
+        )
+        task_type = np.fromiter(
+            (PRIORITY_TYPE_WEIGHTS.get(t.get('task_type'), 0) for t in tasks), dtype=np.int16, count=count
+        )
+
+        urgency = np.where(has_deadline, np.select(
+            [days_until_deadline < 0, days_until_deadline <= 1, days_until_deadline <= 3, days_until_deadline <= 7],
+            [100, 50, 30, 20],
+            default=0
+        ), 0)
+
+        return (urgency + status + risk + task_type).astype(float)
@@ -1,146 +1,206 @@
-import json
 from datetime import date, datetime
-from typing import Dict, Any, List
-from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Tuple
+from cachetools import TTLCache
+import orjson
+from sqlalchemy import and_, bindparam, case, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from ..models.daily_report import DailyReport
-from ..models.task import Task
+from ..models.task import Task, TaskStatus, RiskLevel
 from ..models.project import Project
 from .ai_service import AIService
 
+# Stakeholder emails keyed on the report content they were generated from
+stakeholder_email_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+
+# Most recent report of a project
+LATEST_REPORT_QUERY = select(DailyReport).where(
+    DailyReport.project_id == bindparam('project_id')
+).order_by(DailyReport.date.desc()).limit(1)
+
+# Highest-priority tasks stored on each daily report
+REPORT_TOP_TASKS = 10
+
+# Task columns read when building a daily report
+REPORT_TASK_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.status,
+    Task.deadline,
+    Task.assignee,
+    Task.priority_score,
+    Task.ai_risk_level,
+    Task.task_type,
+)
+
+# Task counts behind the timeline status, aggregated in the database
+TIMELINE_COUNTS_QUERY = select(
+    func.count(Task.id).label('total'),
+    func.sum(case((Task.status == TaskStatus.DONE, 1), else_=0)).label('completed'),
+    func.sum(case((Task.status == TaskStatus.BLOCKED, 1), else_=0)).label('blocked'),
+    func.sum(case(
+        (and_(Task.deadline < bindparam('now'), Task.status != TaskStatus.DONE), 1), else_=0
+    )).label('overdue'),
+    func.sum(case((Task.ai_risk_level == RiskLevel.HIGH, 1), else_=0)).label('high_risk')
+).where(Task.project_id == bindparam('project_id'))
+
+# INSERT constructs supporting ON CONFLICT, per database dialect
+UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
 
 class ReportService:
     """Service for generating and managing daily reports"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.ai_service = AIService()
 
-    def generate_daily_report(self, project_id: int) -> DailyReport:
+    async def generate_daily_report(self, project_id: int) -> DailyReport:
         """Generate a comprehensive daily report for a project"""
-        # Get project
-        project = self.db.query(Project).filter(Project.id == project_id).first()
+        report, _ = await self._build_report_payload(project_id)
+        return report
+
+    async def _build_report_payload(self, project_id: int) -> Tuple[DailyReport, Dict[str, Any]]:
+        """Generate and store today's report, also returning its content unserialized"""
+        # Get project with its tasks in one query, skipping task columns the report never reads
+        result = await self.db.execute(
+            select(Project)
+            .options(joinedload(Project.tasks).load_only(*REPORT_TASK_COLUMNS))
+            .where(Project.id == project_id)
+        )
+        project = result.unique().scalar_one_or_none()
         if not project:
             raise ValueError(f"Project {project_id} not found")
 
-        # Get all tasks
-        tasks = self.db.query(Task).filter(Task.project_id == project_id).all()
-
-        # Convert tasks to dictionaries for AI processing
+        # Convert tasks to dictionaries for AI processing, collecting blocked tasks on the way
+        now = datetime.now()
         task_dicts = []
-        for task in tasks:
+        blocked_tasks = []
+        for task in project.tasks:
+            task_status = getattr(task.status, 'value', task.status)
             task_dicts.append({
                 'id': task.id,
                 'title': task.title,
                 'description': task.description,
-                'status': task.status.value if hasattr(task.status, 'value') else task.status,
+                'status': task_status,
                 'deadline': task.deadline,
                 'assignee': task.assignee,
                 'priority_score': task.priority_score,
-                'ai_risk_level': task.ai_risk_level.value if hasattr(task.ai_risk_level, 'value') else task.ai_risk_level,
-                'task_type': task.task_type.value if hasattr(task.task_type, 'value') else task.task_type,
-                'current_date': datetime.now()
+                'ai_risk_level': getattr(task.ai_risk_level, 'value', task.ai_risk_level),
+                'task_type': getattr(task.task_type, 'value', task.task_type),
+                'current_date': now
             })
+            if task_status == 'blocked':
+                blocked_tasks.append({'task': task.title, 'reason': 'Marked as blocked'})
 
         # Rank tasks by priority
-        ranked_tasks = self.ai_service.rank_tasks_by_priority(task_dicts)
+        top_tasks = self.ai_service.rank_tasks_by_priority(task_dicts, top_k=REPORT_TOP_TASKS)
 
         # Generate AI summary
-        ai_summary = self.ai_service.generate_daily_summary(task_dicts, project.name)
+        ai_summary = await self.ai_service.generate_daily_summary(task_dicts, project.name)
 
-        # Extract blocked tasks
-        blocked_tasks = [
-            {'task': t['title'], 'reason': 'Marked as blocked'}
-            for t in task_dicts
-            if t['status'] == 'blocked'
-        ]
+        payload = {
+            'summary_text': ai_summary.get('summary_text', ''),
+            'priority_tasks': top_tasks,
+            'risks': ai_summary.get('risks', []),
+            'blocked_tasks': blocked_tasks
+        }
+        report_fields = {
+            'summary_text': payload['summary_text'],
+            'priority_list_json': orjson.dumps(payload['priority_tasks']).decode(),
+            'risks_json': orjson.dumps(payload['risks']).decode(),
+            'blocked_tasks_json': orjson.dumps(payload['blocked_tasks']).decode()
+        }
 
-        # Create daily report
-        report = DailyReport(
+        # Create today's report, or overwrite it if one already exists
+        insert = UPSERT_INSERTS[self.db.bind.dialect.name]
+        stmt = insert(DailyReport).values(
             project_id=project_id,
             date=date.today(),
-            summary_text=ai_summary.get('summary_text', ''),
-            priority_list_json=json.dumps(ranked_tasks[:10]),  # Top 10 tasks
-            risks_json=json.dumps(ai_summary.get('risks', [])),
-            blocked_tasks_json=json.dumps(blocked_tasks)
-        )
-
-        # Check if report already exists for today
-        existing_report = self.db.query(DailyReport).filter(
-            DailyReport.project_id == project_id,
-            DailyReport.date == date.today()
-        ).first()
-
-        if existing_report:
-            # Update existing report
-            existing_report.summary_text = report.summary_text
-            existing_report.priority_list_json = report.priority_list_json
-            existing_report.risks_json = report.risks_json
-            existing_report.blocked_tasks_json = report.blocked_tasks_json
-            self.db.commit()
-            return existing_report
-        else:
-            # Create new report
-            self.db.add(report)
-            self.db.commit()
-            self.db.refresh(report)
-            return report
-
-    def get_report_summary(self, report_id: int) -> Dict[str, Any]:
+            **report_fields
+        ).on_conflict_do_update(
+            index_elements=[DailyReport.project_id, DailyReport.date],
+            set_=report_fields
+        ).returning(DailyReport)
+
+        result = await self.db.scalars(stmt, execution_options={"populate_existing": True})
+        report = result.one()
+        await self.db.commit()
+        return report, payload
+
+    async def get_report_summary(self, report_id: int) -> Dict[str, Any]:
         """Get formatted summary from a daily report"""
-        report = self.db.query(DailyReport).filter(DailyReport.id == report_id).first()
+        report = await self.db.get(DailyReport, report_id)
         if not report:
             raise ValueError(f"Report {report_id} not found")
 
         return {
             'date': str(report.date),
             'summary': report.summary_text,
-            'priority_tasks': json.loads(report.priority_list_json) if report.priority_list_json else [],
-            'risks': json.loads(report.risks_json) if report.risks_json else [],
-            'blocked_tasks': json.loads(report.blocked_tasks_json) if report.blocked_tasks_json else []
+            'priority_tasks': orjson.loads(report.priority_list_json) if report.priority_list_json else [],
+            'risks': orjson.loads(report.risks_json) if report.risks_json else [],
+            'blocked_tasks': orjson.loads(report.blocked_tasks_json) if report.blocked_tasks_json else []
         }
 
-    def generate_stakeholder_email(self, project_id: int) -> str:
+    async def generate_stakeholder_email(self, project_id: int) -> str:
         """Generate stakeholder update email for a project"""
         # Get latest report
-        report = self.db.query(DailyReport).filter(
-            DailyReport.project_id == project_id
-        ).order_by(DailyReport.date.desc()).first()
+        result = await self.db.execute(LATEST_REPORT_QUERY, {'project_id': project_id})
+        report = result.scalar_one_or_none()
 
+        summary_data = None
         if not report:
-            # Generate new report first
-            report = self.generate_daily_report(project_id)
+            # Generate new report first, keeping its content to skip re-parsing it below
+            report, summary_data = await self._build_report_payload(project_id)
 
         # Get project
-        project = self.db.query(Project).filter(Project.id == project_id).first()
+        project = await self.db.get(Project, project_id)
+
+        # Reuse the email while the report it was written from is unchanged
+        cache_key = (
+            project_id,
+            report.id,
+            project.name,
+            hash((report.summary_text, report.priority_list_json, report.risks_json, report.blocked_tasks_json))
+        )
+        cached_email = stakeholder_email_cache.get(cache_key)
+        if cached_email is not None:
+            return cached_email
 
         # Format summary data
-        summary_data = {
-            'summary_text': report.summary_text,
-            'priority_tasks': json.loads(report.priority_list_json) if report.priority_list_json else [],
-            'risks': json.loads(report.risks_json) if report.risks_json else [],
-            'blocked_tasks': json.loads(report.blocked_tasks_json) if report.blocked_tasks_json else []
-        }
+        if summary_data is None:
+            summary_data = {
+                'summary_text': report.summary_text,
+                'priority_tasks': orjson.loads(report.priority_list_json) if report.priority_list_json else [],
+                'risks': orjson.loads(report.risks_json) if report.risks_json else [],
+                'blocked_tasks': orjson.loads(report.blocked_tasks_json) if report.blocked_tasks_json else []
+            }
 
         # Generate stakeholder update
-        return self.ai_service.generate_stakeholder_update(summary_data, project.name)
+        email = await self.ai_service.generate_stakeholder_update(summary_data, project.name)
+        stakeholder_email_cache[cache_key] = email
+        return email
 
-    def get_timeline_status(self, project_id: int) -> Dict[str, Any]:
+    async def get_timeline_status(self, project_id: int) -> Dict[str, Any]:
         """Get overall timeline status for a project"""
-        tasks = self.db.query(Task).filter(Task.project_id == project_id).all()
+        result = await self.db.execute(
+            TIMELINE_COUNTS_QUERY, {'project_id': project_id, 'now': datetime.now()}
+        )
+        total_tasks, completed_tasks, blocked_tasks, overdue_tasks, high_risk_tasks = result.one()
 
-        if not tasks:
+        # The sums are NULL only when there are no tasks to count
+        if not total_tasks:
             return {
                 'status': 'Needs More Info',
                 'reason': 'No tasks found in project'
             }
 
-        # Analyze tasks
-        total_tasks = len(tasks)
-        completed_tasks = len([t for t in tasks if t.status.value == 'done'])
-        blocked_tasks = len([t for t in tasks if t.status.value == 'blocked'])
-        overdue_tasks = len([t for t in tasks if t.deadline and t.deadline < datetime.now() and t.status.value != 'done'])
-        high_risk_tasks = len([t for t in tasks if t.ai_risk_level.value == 'high'])
-
         completion_rate = completed_tasks / total_tasks if total_tasks > 0 else 0
 
         # Determine status
@@ -1,33 +1,115 @@
+import asyncio
 import csv
-import json
-from io import StringIO
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime, date
-from sqlalchemy.orm import Session
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import SessionLocal
 from ..models.task import Task, TaskStatus
 from .ai_service import AIService
 
+CSV_IMPORT_CHUNK_SIZE = 500
+
+# Accepted header spellings for each CSV column, tried in order
+CSV_COLUMN_ALIASES = {
+    'title': ('title', 'Title', 'name', 'Name'),
+    'description': ('description', 'Description'),
+    'status': ('status', 'Status'),
+    'assignee': ('assignee', 'Assignee'),
+    'deadline': ('deadline', 'Deadline'),
+}
+CSV_DEADLINE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y')
+
+# Imported status strings, lowercased with spaces as underscores
+STATUS_ALIASES = {
+    'todo': TaskStatus.TODO,
+    'to_do': TaskStatus.TODO,
+    'in_progress': TaskStatus.IN_PROGRESS,
+    'inprogress': TaskStatus.IN_PROGRESS,
+    'doing': TaskStatus.IN_PROGRESS,
+    'done': TaskStatus.DONE,
+    'completed': TaskStatus.DONE,
+    'blocked': TaskStatus.BLOCKED,
+    'unclear': TaskStatus.UNCLEAR
+}
+
+# Tasks sent to Claude per analysis call during enrichment
+AI_BATCH_SIZE = 5
+
+# Concurrent Claude calls per enrichment run, to stay under Anthropic rate limits
+AI_CONCURRENCY = 10
+
+TRELLO_API_URL = "https://api.trello.com/1"
+TRELLO_LIST_FIELDS = "name"
+TRELLO_CARD_FIELDS = "name,desc,due,idList"
+
+# Trello list-name keywords in the order they are checked
+TRELLO_STATUS_KEYWORDS = (
+    (TaskStatus.DONE, ('done', 'complete')),
+    (TaskStatus.IN_PROGRESS, ('progress', 'doing')),
+    (TaskStatus.BLOCKED, ('blocked', 'waiting')),
+)
+
+# Shared client so Trello imports reuse pooled HTTP/2 connections
+trello_http = httpx.AsyncClient(
+    base_url=TRELLO_API_URL,
+    http2=True,
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+    timeout=30.0
+)
+
 
 class TaskService:
     """Service for task management and import functionality"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.ai_service = AIService()
 
-    def import_from_csv(self, csv_content: str, project_id: int) -> List[Task]:
-        """Import tasks from CSV content"""
+    async def import_from_csv(self, csv_lines: Iterable[str], project_id: int) -> List[Task]:
+        """
+        Import tasks from CSV lines, bulk inserting CSV_IMPORT_CHUNK_SIZE rows
+        at a time in a single transaction. AI analysis is left to enrich_with_ai.
+        """
         tasks = []
-        csv_file = StringIO(csv_content)
-        reader = csv.DictReader(csv_file)
+        parsed_rows = self._parse_csv(csv_lines, project_id)
+        while True:
+            # Read and parse each chunk in the threadpool so large uploads don't block the event loop
+            rows = await run_in_threadpool(list, islice(parsed_rows, CSV_IMPORT_CHUNK_SIZE))
+            if not rows:
+                break
+            tasks.extend(await self._bulk_insert(rows))
+
+        await self.db.commit()
+        return tasks
+
+    def _parse_csv(self, csv_lines: Iterable[str], project_id: int) -> Iterator[Dict[str, Any]]:
+        """Yield an insert row for each CSV line that has a title"""
+        reader = csv.reader(csv_lines)
+        headers = next(reader, [])
+        width = len(headers)
+
+        # Resolve which column index each field uses once, not per row
+        column_index = {name: index for index, name in enumerate(headers)}
+        title_index, description_index, status_index, assignee_index, deadline_index = (
+            next((column_index[name] for name in aliases if name in column_index), None)
+            for aliases in CSV_COLUMN_ALIASES.values()
+        )
 
         for row in reader:
+            # Pad short rows so every header has a value
+            if len(row) < width:
+                row += [''] * (width - len(row))
+
             # Parse CSV row
-            title = row.get('title') or row.get('Title') or row.get('name') or row.get('Name')
-            description = row.get('description') or row.get('Description', '')
-            status = row.get('status') or row.get('Status', 'todo')
-            assignee = row.get('assignee') or row.get('Assignee', '')
-            deadline_str = row.get('deadline') or row.get('Deadline', '')
+            title = row[title_index] if title_index is not None else None
+            description = (row[description_index] if description_index is not None else None) or ''
+            status = (row[status_index] if status_index is not None else None) or 'todo'
+            assignee = row[assignee_index] if assignee_index is not None else None
+            deadline_str = row[deadline_index] if deadline_index is not None else None
 
             if not title:
                 continue
@@ -35,159 +117,169 @@ class TaskService:
             # Parse deadline
             deadline = None
             if deadline_str:
-                try:
-                    deadline = datetime.strptime(deadline_str, '%Y-%m-%d')
-                except:
+                for deadline_format in CSV_DEADLINE_FORMATS:
                     try:
-                        deadline = datetime.strptime(deadline_str, '%m/%d/%Y')
-                    except:
-                        pass
-
-            # Analyze task with AI
-            ai_analysis = self.ai_service.analyze_task(title, description)
-
-            # Create task
-            task = Task(
-                project_id=project_id,
-                title=title,
-                description=ai_analysis.get('description', description),
-                status=self._normalize_status(status),
-                task_type=ai_analysis.get('task_type', 'feature'),
-                assignee=assignee if assignee else None,
-                deadline=deadline,
-                acceptance_criteria=json.dumps(ai_analysis.get('acceptance_criteria', [])),
-                subtasks=json.dumps(ai_analysis.get('subtasks', [])),
-                story_points=ai_analysis.get('story_points', 3),
-                tags=json.dumps(ai_analysis.get('tags', []))
-            )
-
-            # Calculate priority and risk
-            task_dict = self._task_to_dict(task)
-            task.priority_score = self.ai_service.calculate_priority_score(task_dict)
-            task.ai_risk_level = self.ai_service.detect_risk_level(task_dict)
+                        deadline = datetime.strptime(deadline_str, deadline_format)
+                        break
+                    except ValueError:
+                        continue
 
-            self.db.add(task)
-            tasks.append(task)
+            yield {
+                'project_id': project_id,
+                'title': title,
+                'description': description,
+                'status': self._normalize_status(status),
+                'assignee': assignee if assignee else None,
+                'deadline': deadline
+            }
 
-        self.db.commit()
-        return tasks
-
-    def import_from_trello(self, board_id: str, project_id: int, api_key: str, token: str) -> List[Task]:
-        """Import tasks from Trello board"""
+    async def import_from_trello(self, board_id: str, project_id: int, api_key: str, token: str) -> List[Task]:
+        """Import tasks from Trello board. AI analysis is left to enrich_with_ai."""
         try:
-            from trello import TrelloClient
-
-            client = TrelloClient(api_key=api_key, token=token)
-            board = client.get_board(board_id)
-            tasks = []
+            # Fetch lists and cards concurrently, trimmed to the fields we map.
+            # Credentials go in a header so they never appear in URLs or error messages
+            headers = {"Authorization": f'OAuth oauth_consumer_key="{api_key}", oauth_token="{token}"'}
+            lists_response, cards_response = await asyncio.gather(
+                trello_http.get(f"/boards/{board_id}/lists/all", params={"fields": TRELLO_LIST_FIELDS}, headers=headers),
+                trello_http.get(f"/boards/{board_id}/cards/all", params={"fields": TRELLO_CARD_FIELDS}, headers=headers)
+            )
+            try:
+                lists_response.raise_for_status()
+                cards_response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                raise ValueError(f"Trello returned {e.response.status_code} for board {board_id}") from None
 
-            for card in board.all_cards():
-                # Analyze with AI
-                ai_analysis = self.ai_service.analyze_task(card.name, card.description or "")
+            # Resolve each list's status once, rather than once per card
+            list_statuses = {
+                trello_list["id"]: self._trello_status_to_task_status(trello_list["name"].lower())
+                for trello_list in lists_response.json()
+            }
 
+            rows = []
+            for card in cards_response.json():
                 # Parse deadline
                 deadline = None
-                if card.due_date:
-                    deadline = datetime.strptime(card.due_date[:10], '%Y-%m-%d')
-
-                # Create task
-                task = Task(
-                    project_id=project_id,
-                    title=card.name,
-                    description=ai_analysis.get('description', card.description or ""),
-                    status=self._trello_status_to_task_status(card.list_id, board),
-                    task_type=ai_analysis.get('task_type', 'feature'),
-                    deadline=deadline,
-                    acceptance_criteria=json.dumps(ai_analysis.get('acceptance_criteria', [])),
-                    subtasks=json.dumps(ai_analysis.get('subtasks', [])),
-                    story_points=ai_analysis.get('story_points', 3),
-                    tags=json.dumps(ai_analysis.get('tags', []))
-                )
-
-                # Calculate priority and risk
-                task_dict = self._task_to_dict(task)
-                task.priority_score = self.ai_service.calculate_priority_score(task_dict)
-                task.ai_risk_level = self.ai_service.detect_risk_level(task_dict)
-
-                self.db.add(task)
-                tasks.append(task)
-
-            self.db.commit()
+                if card.get("due"):
+                    deadline = datetime.strptime(card["due"][:10], '%Y-%m-%d')
+
+                rows.append({
+                    'project_id': project_id,
+                    'title': card["name"],
+                    'description': card.get("desc") or "",
+                    'status': list_statuses.get(card["idList"], TaskStatus.TODO),
+                    'deadline': deadline
+                })
+
+            if not rows:
+                return []
+
+            tasks = await self._bulk_insert(rows)
+            await self.db.commit()
             return tasks
         except Exception as e:
             print(f"Error importing from Trello: {e}")
             raise
 
-    def create_task_from_text(self, title: str, description: str, project_id: int) -> Task:
-        """Create a single task with AI analysis"""
-        ai_analysis = self.ai_service.analyze_task(title, description)
-
+    async def create_task_from_text(
+        self,
+        title: str,
+        description: str,
+        project_id: int,
+        deadline: Optional[datetime] = None,
+        assignee: Optional[str] = None
+    ) -> Task:
+        """Create a single task. AI analysis is left to enrich_with_ai."""
         task = Task(
             project_id=project_id,
             title=title,
-            description=ai_analysis.get('description', description),
-            task_type=ai_analysis.get('task_type', 'feature'),
-            acceptance_criteria=json.dumps(ai_analysis.get('acceptance_criteria', [])),
-            subtasks=json.dumps(ai_analysis.get('subtasks', [])),
-            story_points=ai_analysis.get('story_points', 3),
-            tags=json.dumps(ai_analysis.get('tags', []))
+            description=description,
+            deadline=deadline,
+            assignee=assignee or None
         )
 
-        # Calculate priority and risk
-        task_dict = self._task_to_dict(task)
-        task.priority_score = self.ai_service.calculate_priority_score(task_dict)
-        task.ai_risk_level = self.ai_service.detect_risk_level(task_dict)
-
         self.db.add(task)
-        self.db.commit()
-        self.db.refresh(task)
+        await self.db.commit()
+        await self.db.refresh(task)
 
         return task
 
+    async def enrich_with_ai(self, task_ids: List[int]) -> None:
+        """Run AI analysis on stored tasks and fill in priority and risk"""
+        # Skip tasks a previous run already enriched
+        result = await self.db.execute(select(Task).where(Task.id.in_(task_ids), Task.ai_analyzed.is_(False)))
+        tasks = result.scalars().all()
+        semaphore = asyncio.Semaphore(AI_CONCURRENCY)
+
+        async def analyze(batch: List[Task]):
+            async with semaphore:
+                pairs = [(task.title, task.description or "") for task in batch]
+                return batch, await self.ai_service.analyze_tasks_batch(pairs)
+
+        batches = [tasks[i:i + AI_BATCH_SIZE] for i in range(0, len(tasks), AI_BATCH_SIZE)]
+        for next_batch in asyncio.as_completed([analyze(batch) for batch in batches]):
+            batch, analyses = await next_batch
+            now = datetime.now()
+            try:
+                # A savepoint per batch keeps one bad write from undoing the other batches
+                async with self.db.begin_nested():
+                    for task, ai_analysis in zip(batch, analyses):
+                        # Failed analyses leave the task unflagged for POST /tasks/project/{id}/enrich
+                        if ai_analysis is not None:
+                            self._apply_ai_analysis(task, ai_analysis, now)
+
+                # Commit per batch so enriched fields show up as soon as they are ready
+                await self.db.commit()
+            except Exception as e:
+                print(f"Error saving AI analysis: {e}")
+
+    async def _bulk_insert(self, rows: List[Dict[str, Any]]) -> List[Task]:
+        """Insert task rows with one statement and return them as Task objects"""
+        result = await self.db.scalars(insert(Task).returning(Task, sort_by_parameter_order=True), rows)
+        return result.all()
+
+    def _apply_ai_analysis(self, task: Task, ai_analysis: Dict[str, Any], now: Optional[datetime] = None) -> None:
+        """Copy AI analysis onto a task and recalculate priority and risk"""
+        task.description = ai_analysis.get('description', task.description)
+        task.task_type = ai_analysis.get('task_type', 'feature')
+        task.acceptance_criteria = ai_analysis.get('acceptance_criteria', [])
+        task.subtasks = ai_analysis.get('subtasks', [])
+        task.story_points = ai_analysis.get('story_points', 3)
+        task.tags = ai_analysis.get('tags', [])
+        task.ai_analyzed = True
+
+        # Calculate priority and risk
+        task_dict = self._task_to_dict(task, now)
+        task.priority_score = self.ai_service.calculate_priority_score(task_dict)
+        task.ai_risk_level = self.ai_service.detect_risk_level(task_dict)
+
     def _normalize_status(self, status: str) -> TaskStatus:
         """Normalize status string to TaskStatus enum"""
-        status_lower = status.lower().replace(' ', '_')
-        status_map = {
-            'todo': TaskStatus.TODO,
-            'to_do': TaskStatus.TODO,
-            'in_progress': TaskStatus.IN_PROGRESS,
-            'inprogress': TaskStatus.IN_PROGRESS,
-            'doing': TaskStatus.IN_PROGRESS,
-            'done': TaskStatus.DONE,
-            'completed': TaskStatus.DONE,
-            'blocked': TaskStatus.BLOCKED,
-            'unclear': TaskStatus.UNCLEAR
-        }
-        return status_map.get(status_lower, TaskStatus.TODO)
+        return STATUS_ALIASES.get(status.lower().replace(' ', '_'), TaskStatus.TODO)
 
-    def _trello_status_to_task_status(self, list_id: str, board) -> TaskStatus:
-        """Convert Trello list to task status"""
-        # This is a simple heuristic - can be customized
-        try:
-            list_obj = board.get_list(list_id)
-            list_name = list_obj.name.lower()
-
-            if 'done' in list_name or 'complete' in list_name:
-                return TaskStatus.DONE
-            elif 'progress' in list_name or 'doing' in list_name:
-                return TaskStatus.IN_PROGRESS
-            elif 'blocked' in list_name or 'waiting' in list_name:
-                return TaskStatus.BLOCKED
-            else:
-                return TaskStatus.TODO
-        except:
-            return TaskStatus.TODO
-
-    def _task_to_dict(self, task: Task) -> Dict[str, Any]:
+    def _trello_status_to_task_status(self, list_name: str) -> TaskStatus:
+        """Convert a lowercased Trello list name to task status"""
+        # This is a simple heuristic - can be customized in TRELLO_STATUS_KEYWORDS
+        for task_status, keywords in TRELLO_STATUS_KEYWORDS:
+            if any(keyword in list_name for keyword in keywords):
+                return task_status
+        return TaskStatus.TODO
+
+    def _task_to_dict(self, task: Task, now: Optional[datetime] = None) -> Dict[str, Any]:
         """Convert Task model to dictionary for AI processing"""
         return {
             'title': task.title,
             'description': task.description,
-            'status': task.status.value if hasattr(task.status, 'value') else task.status,
+            'status': getattr(task.status, 'value', task.status),
             'deadline': task.deadline,
             'assignee': task.assignee,
             'story_points': task.story_points,
-            'current_date': datetime.now(),
-            'ai_risk_level': task.ai_risk_level.value if hasattr(task.ai_risk_level, 'value') else task.ai_risk_level,
-            'task_type': task.task_type.value if hasattr(task.task_type, 'value') else task.task_type
+            'current_date': now or datetime.now(),
+            'ai_risk_level': getattr(task.ai_risk_level, 'value', task.ai_risk_level),
+            'task_type': getattr(task.task_type, 'value', task.task_type)
         }
+
+
+async def run_ai_enrichment(task_ids: List[int]) -> None:
+    """Background entry point: enrich tasks using a session of its own"""
+    async with SessionLocal() as db:
+        await TaskService(db).enrich_with_ai(task_ids)
@@ -0,0 +1,24 @@
+"""Gunicorn settings for running the API in production
+
+Usage: gunicorn main:app -c gunicorn.conf.py
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# One event loop per process; extra processes use the remaining cores
+workers = int(os.getenv("WEB_CONCURRENCY", 2 * multiprocessing.cpu_count() + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+keepalive = 5
+
+# Report generation waits on Claude, which can take well over the 30s default
+timeout = 120
+graceful_timeout = 30
+
+# Import the app once in the master so workers fork with it already loaded
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
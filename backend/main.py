@@ -1,11 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from app.core.config import settings
 from app.core.database import Base, engine
+from app.core.etag import ETagMiddleware
 from app.api import api_router
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from app.services.ai_service import anthropic_client
+from app.services.task_service import trello_http
 
 # Create FastAPI app
 app = FastAPI(
@@ -13,7 +15,8 @@ app = FastAPI(
     description="AI-powered project management assistant that automates task analysis, generates daily summaries, and provides intelligent insights.",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -25,10 +28,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Let polling clients revalidate GET responses with If-None-Match
+app.add_middleware(ETagMiddleware)
+
+# Compress larger JSON payloads such as task lists and reports
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
 
+@app.on_event("startup")
+async def create_tables():
+    """Create database tables for local development; deployments run Alembic instead"""
+    if not settings.AUTO_CREATE_TABLES:
+        return
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close pooled outbound HTTP connections"""
+    await trello_http.aclose()
+    await anthropic_client.close()
+
+
 @app.get("/")
 def root():
     """Root endpoint"""